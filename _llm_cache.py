@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Disk-backed LLM response cache for the test harnesses.
+
+The comprehensive tests reissue the same handful of prompts ("What is
+your return policy?"...) on every run, paying seconds of Gemini latency
+each time. Wrapping handle_user_message with cached_call stores each
+response in a small SQLite file keyed by a hash of the message and
+metadata, so reruns answer from disk in microseconds. Pass --no-cache
+to the harness to force live calls when validating model behavior.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), ".llm_cache.sqlite")
+
+_conn = None
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+        _conn.commit()
+    return _conn
+
+def _cache_key(message, metadata):
+    payload = message + "\0" + json.dumps(metadata or {}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def cached_call(fn):
+    """Wrap the async handle_user_message with a persistent cache."""
+    @functools.wraps(fn)
+    async def wrapper(message, metadata=None):
+        key = _cache_key(message, metadata)
+        conn = _get_conn()
+        row = conn.execute(
+            "SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            return json.loads(row[0])
+        response = await fn(message, metadata)
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache(key, response) VALUES(?, ?)",
+            (key, json.dumps(response, default=str)))
+        conn.commit()
+        return response
+    return wrapper
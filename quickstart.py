@@ -23,6 +23,28 @@ def print_step(step, message):
     print(f"\n📍 {step}: {message}")
     print("─" * 50)
 
+def install_requirements():
+    """Install requirements without spawning a second interpreter when possible.
+
+    Running pip in-process skips the interpreter + pip cold start that
+    `python -m pip` pays on every invocation. Falls back to subprocess if
+    pip's internal entry point is unavailable (it is a private API).
+    """
+    try:
+        from pip._internal.cli.main import main as pip_main
+    except ImportError:
+        pip_main = None
+
+    if pip_main is not None:
+        return pip_main(["install", "-r", "requirements.txt", "-q"]) == 0
+
+    try:
+        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"],
+                      check=True, capture_output=True)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
 def quick_setup():
     """Quick setup and start process."""
     print_header("Customer Service Agent Quickstart")
@@ -37,12 +59,10 @@ def quick_setup():
     
     # Step 2: Install dependencies
     print_step("2/6", "Installing dependencies")
-    try:
-        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
-                      check=True, capture_output=True)
+    if install_requirements():
         print("✅ Dependencies installed")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to install dependencies: {e}")
+    else:
+        print("❌ Failed to install dependencies")
         return False
     
     # Step 3: Setup environment
@@ -5,13 +5,26 @@ Customer Service Agent Runner Script
 Easy script to start the Customer Service Agent server with proper environment setup.
 """
 
+import functools
 import os
 import sys
-import subprocess
-import platform
-import argparse
 from pathlib import Path
 
+# subprocess, platform and argparse are imported inside the functions
+# that need them so cheap subcommands like `status` don't pay for them.
+
+# load_dotenv() parses the whole .env file each call; do it at most once
+# per process no matter how many subcommands/checks run.
+_ENV_LOADED = False
+
+def _load_env():
+    """Load .env into the environment once per process."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _ENV_LOADED = True
+
 def print_header(title):
     """Print a formatted header."""
     print("\n" + "="*60)
@@ -30,8 +43,10 @@ def print_success(message):
     """Print success message."""
     print(f"✅ {message}")
 
+@functools.lru_cache(maxsize=1)
 def check_environment():
-    """Check if the environment is properly set up."""
+    """Check if the environment is properly set up (memoized per process)."""
+    import platform
     python_executable = "venv/Scripts/python" if platform.system().lower() == "windows" else "venv/bin/python"
     
     # Check if virtual environment exists
@@ -55,12 +70,12 @@ def check_environment():
     print_success("Environment check passed")
     return True
 
+@functools.lru_cache(maxsize=1)
 def validate_api_key():
-    """Validate that API key is set."""
+    """Validate that API key is set (memoized per process)."""
     try:
-        from dotenv import load_dotenv
-        load_dotenv()
-        
+        _load_env()
+
         api_key = os.getenv("GEMINI_API_KEY")
         
         if not api_key:
@@ -83,6 +98,8 @@ def validate_api_key():
 
 def start_server(host="0.0.0.0", port=8000, debug=False):
     """Start the Customer Service Agent server."""
+    import platform
+    import subprocess
     python_executable = "venv/Scripts/python" if platform.system().lower() == "windows" else "venv/bin/python"
     
     print_header("Starting Customer Service Agent")
@@ -143,7 +160,9 @@ def start_server(host="0.0.0.0", port=8000, debug=False):
 def test_server():
     """Run a quick server test."""
     print_header("Testing Server Health")
-    
+
+    import platform
+    import subprocess
     python_executable = "venv/Scripts/python" if platform.system().lower() == "windows" else "venv/bin/python"
     
     try:
@@ -169,8 +188,7 @@ def show_status():
     
     # API key status
     try:
-        from dotenv import load_dotenv
-        load_dotenv()
+        _load_env()
         api_key = os.getenv("GEMINI_API_KEY", "Not set")
         if api_key and api_key != "your_gemini_api_key_here":
             print(f"API Key: {'✅ Set (' + str(len(api_key)) + ' chars)'}")
@@ -187,6 +205,7 @@ def show_status():
 
 def main():
     """Main function with argument parsing."""
+    import argparse
     parser = argparse.ArgumentParser(description="Customer Service Agent Management")
     parser.add_argument("command", nargs="?", choices=["start", "test", "status"], default="start",
                        help="Command to run (default: start)")
@@ -1,5 +1,8 @@
+import asyncio
 import os
 import json
+import re
+from collections import OrderedDict
 from typing import Dict, Any, List
 import google.generativeai as genai
 from google.generativeai import types
@@ -7,6 +10,20 @@ from google.generativeai import types
 from dotenv import load_dotenv
 from tools import kb, tickets, http_tool
 
+try:
+    import orjson  # optional: C-implemented, 2-5x faster than stdlib json
+except ImportError:
+    orjson = None
+
+def _json_loads(text):
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+def _json_dumps(obj) -> str:
+    return orjson.dumps(obj).decode() if orjson is not None else json.dumps(obj)
+
+# Compiled once: recovers a JSON object from prose-wrapped planner output
+_JSON_RE = re.compile(r'(\{.*\})', re.S)
+
 load_dotenv()  # loads .env
 
 api_key = os.getenv("GEMINI_API_KEY")
@@ -20,6 +37,13 @@ if not API_KEY:
 
 client = genai.GenerativeModel(GEMINI_MODEL)
 
+# Constrain planner output to JSON at the decoder level: no prose around
+# the plan, fewer output tokens, and the regex-recovery fallback below
+# becomes a rare event instead of the norm.
+PLANNER_GENERATION_CONFIG = types.GenerationConfig(
+    response_mime_type="application/json"
+)
+
 TOOLS = {
     "search_kb": {
         "description": "Search local knowledge-base. Input: a query string. Returns: list of kb items.",
@@ -33,78 +57,171 @@ TOOLS = {
     }
 }
 
-def call_gemini_planner(user_message: str, context: Dict[str, Any]=None) -> str:
-    prompt = f"""
+# The tool catalog is static; serialize it once instead of per request
+_TOOLS_JSON = _json_dumps(TOOLS)
+
+# Prompt templates are fixed apart from the dynamic tail, so build the
+# prefixes once at import time and concatenate per request.
+_PLANNER_PREFIX = f"""
 You are an autonomous Customer Support planner. Given the user's message, produce a JSON plan with an array 'plan'.
 Each step is an object with fields:
 - action: one of ['search_kb','create_ticket','http_get','respond']
 - args: object with arguments for the action
 - reason: short explanation
 
+The LAST step must always be a 'respond' action whose args.text contains the
+complete, friendly customer-facing reply (assume the earlier steps succeed).
+
 Return only valid JSON.
 
-User message: {user_message}
-Available tools and descriptions: {json.dumps(TOOLS, indent=0)}
-"""
-    response = client.generate_content(prompt)
+Available tools and descriptions: {_TOOLS_JSON}
+User message: """
+
+_SYNTH_PREFIX = """
+Given the following execution trace of tools and findings, write a friendly customer-facing reply summarizing what we found, next steps, and a polite closing.
+
+Execution trace (JSON): """
+
+# LRU cache of successful planner outputs keyed by normalized message.
+# Support traffic is dominated by a small set of FAQ-like questions, so
+# repeats skip the Gemini round-trip entirely.
+_PLANNER_CACHE = OrderedDict()
+_PLANNER_CACHE_MAX = 4096
+_planner_cache_lock = asyncio.Lock()
+
+# In-flight planner calls keyed like the cache: under load, bursts of
+# identical questions coalesce onto one Gemini request instead of each
+# spawning their own.
+_PLANNER_INFLIGHT: Dict[str, asyncio.Task] = {}
+
+def _planner_cache_key(user_message: str) -> str:
+    return " ".join(user_message.lower().split())
+
+async def call_gemini_planner(user_message: str, context: Dict[str, Any]=None) -> str:
+    cache_key = _planner_cache_key(user_message)
+    async with _planner_cache_lock:
+        if cache_key in _PLANNER_CACHE:
+            _PLANNER_CACHE.move_to_end(cache_key)
+            return _PLANNER_CACHE[cache_key]
+        task = _PLANNER_INFLIGHT.get(cache_key)
+        owner = task is None
+        if owner:
+            task = asyncio.create_task(
+                _call_gemini_planner_uncached(user_message, context))
+            _PLANNER_INFLIGHT[cache_key] = task
+
+    if not owner:
+        # Followers share the owner's result.
+        return await asyncio.shield(task)
+
+    try:
+        # The owner shields too: if this request is cancelled (client
+        # disconnect), the underlying Gemini call keeps running so the
+        # followers coalesced onto it still get their plan.
+        plan = await asyncio.shield(task)
+    finally:
+        async with _planner_cache_lock:
+            _PLANNER_INFLIGHT.pop(cache_key, None)
+
+    async with _planner_cache_lock:
+        _PLANNER_CACHE[cache_key] = plan
+        while len(_PLANNER_CACHE) > _PLANNER_CACHE_MAX:
+            _PLANNER_CACHE.popitem(last=False)
+    return plan
+
+async def _call_gemini_planner_uncached(user_message: str, context: Dict[str, Any]=None) -> str:
+    prompt = _PLANNER_PREFIX + user_message
+    response = await client.generate_content_async(
+        prompt, generation_config=PLANNER_GENERATION_CONFIG)
     text = response.text
     try:
-        j = json.loads(text)
+        j = _json_loads(text)
         return j
     except Exception:
-        import re
-        m = re.search(r'(\{.*\})', text, re.S)
+        m = _JSON_RE.search(text)
         if m:
             try:
-                return json.loads(m.group(1))
+                return _json_loads(m.group(1))
             except Exception:
                 raise RuntimeError("Planner produced non-JSON response: " + text)
         else:
             raise RuntimeError("Planner produced non-JSON response: " + text)
 
-def execute_plan(plan: List[Dict[str,Any]]):
-    trace = []
+async def _dispatch_step(step: Dict[str,Any]) -> Dict[str,Any]:
+    """Execute one plan step and return its trace entry."""
+    action = step.get("action")
+    args = step.get("args", {})
+    reason = step.get("reason", "")
+    entry = {"action":action, "reason": reason, "args": args, "result": None}
+    if action == "search_kb":
+        q = args.get("query")
+        top_k = args.get("top_k", 5)
+        # sqlite and requests are blocking; keep them off the event loop
+        res = await asyncio.to_thread(kb.search_kb, q, top_k=top_k)
+        entry["result"] = res
+    elif action == "create_ticket":
+        cid = await asyncio.to_thread(
+            tickets.create_ticket,
+            args.get("customer_name","unknown"),
+            args.get("customer_email","unknown"),
+            args.get("subject","no-subject"),
+            args.get("body",""))
+        entry["result"] = {"ticket_id": cid}
+    elif action == "http_get":
+        url = args.get("url")
+        res = await http_tool.http_get_async(url)
+        entry["result"] = res
+    elif action == "respond":
+        entry["result"] = {"delivered_text": args.get("text")}
+    else:
+        entry["result"] = {"error": f"unknown action {action}"}
+    return entry
+
+async def execute_plan(plan: List[Dict[str,Any]]):
+    # Plan steps never consume each other's output in this agent, so all
+    # of them are independent: dispatch concurrently and pay only the
+    # slowest step's latency. gather preserves trace order by index.
+    trace = list(await asyncio.gather(*(_dispatch_step(step) for step in plan)))
     final_text = None
     for step in plan:
-        action = step.get("action")
-        args = step.get("args", {})
-        reason = step.get("reason", "")
-        entry = {"action":action, "reason": reason, "args": args, "result": None}
-        if action == "search_kb":
-            q = args.get("query")
-            top_k = args.get("top_k", 5)
-            res = kb.search_kb(q, top_k=top_k)
-            entry["result"] = res
-        elif action == "create_ticket":
-            cid = tickets.create_ticket(args.get("customer_name","unknown"),
-                                        args.get("customer_email","unknown"),
-                                        args.get("subject","no-subject"),
-                                        args.get("body",""))
-            entry["result"] = {"ticket_id": cid}
-        elif action == "http_get":
-            url = args.get("url")
-            res = http_tool.http_get(url)
-            entry["result"] = res
-        elif action == "respond":
-            final_text = args.get("text")
-            entry["result"] = {"delivered_text": final_text}
-        else:
-            entry["result"] = {"error": f"unknown action {action}"}
-        trace.append(entry)
+        if step.get("action") == "respond":
+            final_text = step.get("args", {}).get("text")
+    # Fallback only: the planner is asked to end every plan with a
+    # 'respond' step, so in the common case no second Gemini call is made.
     if not final_text:
         summary = {"trace": trace}
-        prompt = f"""
-Given the following execution trace of tools and findings, write a friendly customer-facing reply summarizing what we found, next steps, and a polite closing.
-
-Execution trace (JSON): {json.dumps(summary)}
-"""
-        response = client.generate_content(prompt)
+        prompt = _SYNTH_PREFIX + _json_dumps(summary)
+        response = await client.generate_content_async(prompt)
         final_text = response.text
         trace.append({"action":"synthesize_reply","result": final_text})
     return {"final_text": final_text, "trace": trace}
 
-def handle_user_message(user_message: str, metadata: Dict[str,Any]=None):
-    planner_out = call_gemini_planner(user_message, metadata)
+async def stream_user_message(user_message: str, metadata: Dict[str,Any]=None):
+    """Yield the customer-facing reply incrementally as text chunks.
+
+    Tool steps run exactly as in handle_user_message; only delivery of
+    the final text is incremental, so time-to-first-byte stops waiting
+    on full generation. Streaming clients that need the trace should
+    use the non-streaming endpoint.
+    """
+    planner_out = await call_gemini_planner(user_message, metadata)
+    plan = planner_out.get("plan", [])
+    trace = list(await asyncio.gather(*(_dispatch_step(step) for step in plan)))
+    final_text = None
+    for step in plan:
+        if step.get("action") == "respond":
+            final_text = step.get("args", {}).get("text")
+    if final_text:
+        yield final_text
+        return
+    prompt = _SYNTH_PREFIX + _json_dumps({"trace": trace})
+    response = await client.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+async def handle_user_message(user_message: str, metadata: Dict[str,Any]=None):
+    planner_out = await call_gemini_planner(user_message, metadata)
     plan = planner_out.get("plan", [])
-    res = execute_plan(plan)
+    res = await execute_plan(plan)
     return res
@@ -1,18 +1,31 @@
 import os
 import uvicorn
-from datetime import datetime
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
-from pydantic import BaseModel, Field, EmailStr, field_validator
+from fastapi.responses import HTMLResponse, FileResponse, Response, JSONResponse, StreamingResponse
+
+# orjson-backed responses when available: C-speed encoding and no
+# jsonable_encoder pass over large traces. Plain JSONResponse otherwise.
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:
+    DefaultJSONResponse = JSONResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
+import asyncio
+import json
 import logging
+import re
+import time
 from contextlib import asynccontextmanager
 
-from agent import handle_user_message
-from tools.tickets import create_ticket, update_ticket_status
-from tools.kb import add_kb_entry
+from agent import handle_user_message, stream_user_message
+from db.init_db import init_db
+from tools import http_tool
+from tools.tickets import create_ticket, update_ticket_status, list_open_tickets
+from tools.kb import add_kb_entry, add_kb_entry_with_category, search_kb
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -23,33 +36,63 @@ async def lifespan(app: FastAPI):
     """Initialize and cleanup resources."""
     # Startup: initialize database
     try:
-        from db.init_db import init_db
         init_db()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
-    
+
+    # Warm heavy components so the first user request sees steady-state
+    # latency instead of paying encoder load / index build / TLS setup.
+    if os.environ.get("AGENT_WARMUP", "1") != "0":
+        try:
+            from tools import semantic
+            if semantic.is_available():
+                await asyncio.to_thread(semantic.ensure_index)
+                logger.info("Semantic KB index warmed")
+        except Exception as e:
+            logger.warning(f"Semantic index warmup skipped: {e}")
+        try:
+            from agent import client as gemini_client
+            await gemini_client.generate_content_async(
+                "ping", generation_config={"max_output_tokens": 1})
+            logger.info("Gemini client warmed")
+        except Exception as e:
+            logger.warning(f"Gemini warmup skipped: {e}")
+
     yield
-    
+
     # Shutdown: cleanup if needed
+    try:
+        await http_tool.aclose()
+    except Exception as e:
+        logger.warning(f"HTTP client shutdown error: {e}")
     logger.info("Shutting down Customer Service Agent")
 
 app = FastAPI(
     title="Customer Service Agent API",
     description="AI-powered customer service agent with intelligent responses",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=DefaultJSONResponse
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# CORS: explicit origin allowlist from the environment (comma-separated).
+# With no origins configured the middleware is skipped entirely, so
+# same-origin traffic never pays the per-request origin matching cost.
+_cors_origins = [
+    o.strip() for o in os.environ.get("CORS_ALLOW_ORIGINS", "").split(",")
+    if o.strip()
+]
+if _cors_origins:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=_cors_origins,
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        max_age=3600,
+    )
 
 # Mount static files for dashboard
 try:
@@ -76,10 +119,12 @@ async def dashboard_js():
         logger.error(f"Failed to serve dashboard.js: {e}")
         raise HTTPException(status_code=500, detail="Dashboard JavaScript unavailable")
 
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
 class MessageIn(BaseModel):
     """Input model for customer messages."""
     customer_name: Optional[str] = Field(None, max_length=100, description="Customer's name")
-    customer_email: Optional[EmailStr] = Field(None, description="Customer's email address")
+    customer_email: Optional[str] = Field(None, description="Customer's email address")
     text: str = Field(..., min_length=1, max_length=2000, description="Customer message")
     session_id: Optional[str] = Field(None, description="Session identifier for conversation continuity")
     
@@ -99,6 +144,18 @@ class MessageIn(BaseModel):
                 raise ValueError('Customer name cannot be empty if provided')
         return v
 
+    @field_validator('customer_email')
+    @classmethod
+    def validate_email(cls, v):
+        # Plain str + regex instead of EmailStr: avoids email-validator's
+        # IDN machinery on every request parse, which dominates Pydantic
+        # cost for small bodies like this one.
+        if v is not None:
+            v = v.strip()
+            if not _EMAIL_RE.match(v):
+                raise ValueError('Invalid email address')
+        return v
+
 class MessageOut(BaseModel):
     """Output model for agent responses."""
     reply: str = Field(..., description="Agent's response to the customer")
@@ -106,6 +163,15 @@ class MessageOut(BaseModel):
     session_id: Optional[str] = Field(None, description="Session identifier")
     confidence: Optional[float] = Field(None, ge=0, le=1, description="Confidence score for the response")
 
+class BatchMessagesIn(BaseModel):
+    """Input model for a batch of customer messages."""
+    messages: List[MessageIn] = Field(..., min_length=1, max_length=20, description="Messages to process in order")
+    session_id: Optional[str] = Field(None, description="Session identifier applied to messages that don't set one")
+
+class BatchMessagesOut(BaseModel):
+    """Output model for batch message processing."""
+    replies: List[MessageOut] = Field(..., description="One reply per input message, in order")
+
 class HealthCheck(BaseModel):
     """Health check response model."""
     status: str = "healthy"
@@ -142,7 +208,6 @@ async def dashboard():
 async def favicon():
     """Serve the favicon file."""
     try:
-        from fastapi.responses import Response
         favicon_path = os.path.join(os.path.dirname(__file__), "frontend", "favicon.ico")
         if os.path.exists(favicon_path):
             return FileResponse(favicon_path)
@@ -157,7 +222,6 @@ async def health_check():
     """Health check endpoint."""
     try:
         # Check if we can connect to the database
-        from tools.kb import search_kb
         search_kb("test", top_k=1)
         
         return HealthCheck(
@@ -189,17 +253,23 @@ async def message_endpoint(msg: MessageIn):
             "customer_name": msg.customer_name,
             "customer_email": str(msg.customer_email) if msg.customer_email else None,
             "session_id": msg.session_id,
-                "timestamp": str(datetime.now())
+                "timestamp": time.time_ns()
         }
         
-        # Process the message
-        response = handle_user_message(msg.text, metadata)
-        
-        return MessageOut(
-            reply=response["final_text"],
-            trace=response["trace"],
-            session_id=msg.session_id
-        )
+        # Process the message; awaiting keeps the event loop free to
+        # serve other requests during the LLM round-trips.
+        response = await handle_user_message(msg.text, metadata)
+
+        # Returning a Response directly skips Pydantic re-validation and
+        # jsonable_encoder on the way out; traces with KB content are the
+        # largest payloads this API emits. The declared response_model
+        # still documents the schema.
+        return DefaultJSONResponse({
+            "reply": response["final_text"],
+            "trace": response["trace"],
+            "session_id": msg.session_id,
+            "confidence": None
+        })
         
     except Exception as e:
         logger.error(f"Error processing message: {e}")
@@ -208,11 +278,72 @@ async def message_endpoint(msg: MessageIn):
             detail=f"Failed to process message: {str(e)}"
         )
 
+@app.post("/message/stream")
+async def message_stream_endpoint(msg: MessageIn):
+    """
+    Process a customer message and stream the reply as server-sent events.
+
+    Each event's data is a JSON object {"text": chunk}; the stream ends
+    with a literal [DONE] event. Time-to-first-byte is the planner
+    round-trip instead of the full generation.
+    """
+    metadata = {
+        "customer_name": msg.customer_name,
+        "customer_email": str(msg.customer_email) if msg.customer_email else None,
+        "session_id": msg.session_id,
+        "timestamp": time.time_ns()
+    }
+
+    async def event_stream():
+        try:
+            async for chunk in stream_user_message(msg.text, metadata):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/messages/batch", response_model=BatchMessagesOut)
+async def messages_batch_endpoint(batch: BatchMessagesIn):
+    """
+    Process several customer messages in one request.
+
+    Saves one HTTP round-trip per message for clients that already know
+    all the messages they want answered (demos, test harnesses, imports).
+    Messages are processed in order; a failure on one message produces an
+    error reply for that message instead of failing the whole batch.
+    """
+    replies = []
+    for msg in batch.messages:
+        session_id = msg.session_id or batch.session_id
+        try:
+            metadata = {
+                "customer_name": msg.customer_name,
+                "customer_email": str(msg.customer_email) if msg.customer_email else None,
+                "session_id": session_id,
+                "timestamp": time.time_ns()
+            }
+            response = await handle_user_message(msg.text, metadata)
+            replies.append(MessageOut(
+                reply=response["final_text"],
+                trace=response["trace"],
+                session_id=session_id
+            ))
+        except Exception as e:
+            logger.error(f"Error processing batched message: {e}")
+            replies.append(MessageOut(
+                reply=f"Sorry, we could not process this message: {str(e)}",
+                trace=[{"action": "error", "result": str(e)}],
+                session_id=session_id
+            ))
+    return BatchMessagesOut(replies=replies)
+
 @app.get("/kb/search")
 async def search_knowledge_base(q: str = "", top_k: int = 5):
     """Search the knowledge base directly."""
     try:
-        from tools.kb import search_kb
         results = search_kb(q, top_k=min(top_k, 20))  # Cap at 20 for performance
         return {"query": q, "results": results}
     except Exception as e:
@@ -223,7 +354,6 @@ async def search_knowledge_base(q: str = "", top_k: int = 5):
 async def list_tickets():
     """List open support tickets."""
     try:
-        from tools.tickets import list_open_tickets
         tickets = list_open_tickets()
         return {"tickets": tickets}
     except Exception as e:
@@ -265,11 +395,29 @@ async def update_ticket(ticket_id: int, update_data: dict):
         logger.error(f"Ticket update error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/debug/snapshot")
+async def debug_snapshot(request: dict):
+    """
+    Aggregate open tickets and a batch of KB searches in one call.
+
+    Replaces the chatty one-GET-per-query pattern used by test clients
+    with a single request: {"kb_queries": [...], "top_k": 2}.
+    """
+    try:
+        kb_queries = request.get("kb_queries", [])
+        top_k = min(int(request.get("top_k", 5)), 20)
+        return {
+            "tickets": list_open_tickets(),
+            "kb_hits": {q: search_kb(q, top_k=top_k) for q in kb_queries}
+        }
+    except Exception as e:
+        logger.error(f"Debug snapshot error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/kb")
 async def add_knowledge_base_entry(entry: dict):
     """Add a new knowledge base entry."""
     try:
-        from tools.kb import add_kb_entry_with_category
         success = add_kb_entry_with_category(
             title=entry.get("title", ""),
             content=entry.get("content", ""),
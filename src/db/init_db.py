@@ -1,11 +1,45 @@
 import sqlite3
 import os
+import threading
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "agent_data.db")
 
+# One connection per thread, created once with tuned pragmas. WAL lets
+# /kb/search readers proceed while a ticket insert is in flight, and
+# reusing the connection keeps sqlite's statement cache warm.
+_local = threading.local()
+
+def get_conn() -> sqlite3.Connection:
+    """Return this thread's shared connection, creating it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                               cached_statements=128)
+        conn.row_factory = sqlite3.Row
+        # page_size only takes effect on a freshly created database and
+        # must be set before the WAL journal mode; harmless otherwise.
+        conn.execute("PRAGMA page_size=8192")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        # Writers from different threads wait out each other's commits
+        # instead of surfacing 'database is locked' under test load.
+        conn.execute("PRAGMA busy_timeout=5000")
+        _local.conn = conn
+    return conn
+
+def close_conn():
+    """Close this thread's shared connection, if open."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
 def init_db():
     """Initialize the database with tables and sample data."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_conn()
     c = conn.cursor()
     
     # Tickets table
@@ -22,6 +56,12 @@ def init_db():
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )''')
     
+    # Supporting index so list_open_tickets is O(open tickets), not a
+    # full table scan; id lookups already use the INTEGER PRIMARY KEY.
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_tickets_status_created
+    ON tickets(status, created_at DESC)''')
+
     # KB: FTS5 (Full Text Search)
     c.execute('''
     CREATE VIRTUAL TABLE IF NOT EXISTS kb USING fts5(
@@ -97,12 +137,15 @@ def init_db():
          "gift-cards denominations expiration-date perfect-gifts")
     ]
     
-    # Insert sample KB data
-    for title, content, category, tags in kb_samples:
-        c.execute("""
-        INSERT INTO kb(title, content, category, tags) VALUES(?, ?, ?, ?)
-        """, (title, content, category, tags))
-    
+    # Insert sample KB data in one batch; the statement is parsed once
+    # and the FTS index is updated in a single transaction.
+    c.executemany("""
+    INSERT INTO kb(title, content, category, tags) VALUES(?, ?, ?, ?)
+    """, kb_samples)
+
+    # Compact the FTS index now that seeding is done
+    c.execute("INSERT INTO kb(kb) VALUES('optimize')")
+
     # Insert sample ticket for testing
     c.execute("""
     INSERT OR IGNORE INTO tickets(customer_name, customer_email, subject, body, priority) 
@@ -111,12 +154,21 @@ def init_db():
           "I placed an order last week and haven't received any shipping updates. Order number is #12345.", "medium"))
     
     conn.commit()
-    conn.close()
     print(f"Database initialized successfully at {DB_PATH}")
     print(f"Added {len(kb_samples)} knowledge base entries")
 
+    # Rebuild the semantic index to match the freshly seeded KB. No-op
+    # when the optional embedding dependencies are not installed.
+    try:
+        from tools import semantic
+        if semantic.rebuild_index():
+            print("Semantic KB index rebuilt")
+    except ImportError:
+        pass
+
 def reset_db():
     """Reset the database by dropping and recreating all tables."""
+    close_conn()
     if os.path.exists(DB_PATH):
         os.remove(DB_PATH)
     init_db()
@@ -1,7 +1,134 @@
+import asyncio
 import requests
 import json
 from typing import Dict, Any, Optional
 
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Shared session for the sync helpers: keep-alive pooling means repeat
+# calls to the same host skip the TCP+TLS handshake, and transient 5xx
+# responses are retried with a short backoff. Session is thread-safe
+# for this usage.
+_SESSION = requests.Session()
+_SESSION.headers['User-Agent'] = 'CustomerServiceAgent/1.0'
+_retry = Retry(
+    total=3,
+    connect=2,
+    read=2,
+    backoff_factor=0.3,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset(['GET', 'POST']))
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=_retry)
+_SESSION.mount('http://', _adapter)
+_SESSION.mount('https://', _adapter)
+
+_ALLOWED_SCHEMES = frozenset(('http', 'https'))
+
+# Prebuilt error payloads: the failure paths return a cheap shallow
+# copy instead of rebuilding the 4-field literal at each site.
+_ERR_BASE = {"success": False, "status_code": 0, "text": "", "error": None}
+_ERR_INVALID_URL = {**_ERR_BASE, "error": "Invalid URL format"}
+_ERR_TIMEOUT = {**_ERR_BASE, "error": "Request timed out"}
+_ERR_CONN = {**_ERR_BASE, "error": "Connection error"}
+
+def _err(message: str) -> Dict[str, Any]:
+    return {**_ERR_BASE, "error": message}
+
+# Copying all 10-40 response headers per call is wasted work; only the
+# ones callers actually consume are kept.
+_HEADER_WHITELIST = ('content-type', 'content-length', 'etag',
+                     'last-modified', 'retry-after')
+
+def _slim_headers(headers) -> Dict[str, str]:
+    return {k: headers[k] for k in _HEADER_WHITELIST if k in headers}
+
+def _valid_url(url: Optional[str]) -> bool:
+    """True for well-formed http(s) URLs with a host. urlsplit also
+    rejects malformed ones like http:/example.com that a prefix check
+    would let through."""
+    if not url:
+        return False
+    sp = urlsplit(url)
+    return sp.scheme in _ALLOWED_SCHEMES and bool(sp.netloc)
+
+# Shared async client with bounded keep-alive pooling: tool calls made
+# from the agent's event loop reuse connections instead of paying a
+# TCP+TLS handshake each time.
+_async_client = None
+
+def _get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            headers={'User-Agent': 'CustomerServiceAgent/1.0'}
+        )
+    return _async_client
+
+def _read_capped(response, limit: int = 4000) -> str:
+    """Read at most `limit` bytes of a streamed response body.
+
+    The old `.text[:4000]` downloaded and decoded the full body before
+    slicing; this stops pulling bytes off the wire at the cap.
+    """
+    try:
+        raw = response.raw.read(limit, decode_content=True)
+        return raw.decode(response.encoding or 'utf-8', errors='replace')
+    finally:
+        response.close()
+
+async def aclose():
+    """Close the shared async client (called on app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+async def http_get_async(url: str, headers: Optional[Dict[str, str]] = None,
+                         params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Async variant of http_get using the shared pooled client.
+
+    Returns the same shape as http_get. Falls back to running the
+    synchronous http_get in a thread when httpx is not installed.
+    """
+    if httpx is None:
+        return await asyncio.to_thread(http_get, url, headers, params)
+
+    if not _valid_url(url):
+        return dict(_ERR_INVALID_URL)
+
+    try:
+        response = await _get_async_client().get(url, headers=headers, params=params)
+        response_text = response.text[:4000] if response.text else ""
+        return {
+            "success": True,
+            "status_code": response.status_code,
+            "text": response_text,
+            "headers": _slim_headers(response.headers),
+            "error": None
+        }
+    except httpx.TimeoutException:
+        return dict(_ERR_TIMEOUT)
+    except httpx.ConnectError:
+        return dict(_ERR_CONN)
+    except httpx.HTTPError as e:
+        return _err(f"Request error: {e}")
+    except Exception as e:
+        return _err(f"Unexpected error: {e}")
+
 def http_get(url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Make a safe HTTP GET request with proper error handling.
@@ -15,61 +142,30 @@ def http_get(url: str, headers: Optional[Dict[str, str]] = None, params: Optiona
         Dict[str, Any]: Response with status_code, success, text, and error fields
     """
     try:
-        # Add default timeout and validate URL
-        if not url or not url.startswith(('http://', 'https://')):
-            return {
-                "success": False,
-                "status_code": 0,
-                "text": "",
-                "error": "Invalid URL format"
-            }
-            
-        # Set default headers
-        default_headers = {'User-Agent': 'CustomerServiceAgent/1.0'}
-        if headers:
-            default_headers.update(headers)
+        if not _valid_url(url):
+            return dict(_ERR_INVALID_URL)
             
-        response = requests.get(url, headers=default_headers, params=params, timeout=10)
-        
-        # Limit response text size to prevent memory issues
-        response_text = response.text[:4000] if response.text else ""
-        
+        # User-Agent comes from the session; pass only per-call overrides
+        response = _SESSION.get(url, headers=headers, params=params,
+                                timeout=10, stream=True)
+        response_text = _read_capped(response)
+
         return {
             "success": True,
             "status_code": response.status_code,
             "text": response_text,
-            "headers": dict(response.headers),
+            "headers": _slim_headers(response.headers),
             "error": None
         }
         
     except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "status_code": 0,
-            "text": "",
-            "error": "Request timed out"
-        }
+        return dict(_ERR_TIMEOUT)
     except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "status_code": 0,
-            "text": "",
-            "error": "Connection error"
-        }
+        return dict(_ERR_CONN)
     except requests.exceptions.RequestException as e:
-        return {
-            "success": False,
-            "status_code": 0,
-            "text": "",
-            "error": f"Request error: {str(e)}"
-        }
+        return _err(f"Request error: {e}")
     except Exception as e:
-        return {
-            "success": False,
-            "status_code": 0,
-            "text": "",
-            "error": f"Unexpected error: {str(e)}"
-        }
+        return _err(f"Unexpected error: {e}")
 
 def http_post(url: str, data: Optional[Dict[str, Any]] = None, json_data: Optional[Dict[str, Any]] = None, 
               headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
@@ -86,41 +182,22 @@ def http_post(url: str, data: Optional[Dict[str, Any]] = None, json_data: Option
         Dict[str, Any]: Response with status_code, success, text, and error fields
     """
     try:
-        if not url or not url.startswith(('http://', 'https://')):
-            return {
-                "success": False,
-                "status_code": 0,
-                "text": "",
-                "error": "Invalid URL format"
-            }
+        if not _valid_url(url):
+            return dict(_ERR_INVALID_URL)
             
-        default_headers = {'User-Agent': 'CustomerServiceAgent/1.0'}
-        if headers:
-            default_headers.update(headers)
-            
-        response = requests.post(url, data=data, json=json_data, headers=default_headers, timeout=10)
-        
-        response_text = response.text[:4000] if response.text else ""
-        
+        response = _SESSION.post(url, data=data, json=json_data, headers=headers,
+                                 timeout=10, stream=True)
+        response_text = _read_capped(response)
+
         return {
             "success": True,
             "status_code": response.status_code,
             "text": response_text,
-            "headers": dict(response.headers),
+            "headers": _slim_headers(response.headers),
             "error": None
         }
         
     except requests.exceptions.RequestException as e:
-        return {
-            "success": False,
-            "status_code": 0,
-            "text": "",
-            "error": f"Request error: {str(e)}"
-        }
+        return _err(f"Request error: {e}")
     except Exception as e:
-        return {
-            "success": False,
-            "status_code": 0,
-            "text": "",
-            "error": f"Unexpected error: {str(e)}"
-        }
+        return _err(f"Unexpected error: {e}")
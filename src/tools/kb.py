@@ -1,9 +1,37 @@
+import logging
 import sqlite3
-import sqlite3 as sqlite
-import os
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "../db/agent_data.db")
+from db.init_db import get_conn
+
+logger = logging.getLogger(__name__)
+
+# Stable SQL strings so sqlite3's per-connection statement cache
+# parses each query once.
+# Rank in a CTE over rowid + bm25 first, then join back for the
+# content columns: guarantees the planner drives the FTS index and
+# defers loading title/content until after the LIMIT.
+SQL_SEARCH_KB = """
+WITH m AS (SELECT rowid, bm25(kb) AS r FROM kb WHERE kb MATCH ? ORDER BY r LIMIT ?)
+SELECT k.title, k.content FROM m JOIN kb k ON k.rowid = m.rowid ORDER BY m.r
+"""
+SQL_INSERT_KB = "INSERT INTO kb(title, content) VALUES(?, ?)"
+SQL_INSERT_KB_CAT = "INSERT INTO kb(title, content, category, tags) VALUES(?, ?, ?, ?)"
+SQL_ALL_KB = "SELECT title, content FROM kb"
+
+# Schema detection result for the insert path, resolved once on first
+# use (the table may not exist yet at import time). The kb schema only
+# changes across deployments, never at runtime.
+_KB_HAS_CATEGORY: Optional[bool] = None
+
+def _kb_has_category(c) -> bool:
+    global _KB_HAS_CATEGORY
+    if _KB_HAS_CATEGORY is None:
+        c.execute("PRAGMA table_info(kb)")
+        columns = [col[1] for col in c.fetchall()]
+        _KB_HAS_CATEGORY = 'category' in columns and 'tags' in columns
+    return _KB_HAS_CATEGORY
 
 def search_kb(query: str, top_k: int = 5) -> List[Dict[str, str]]:
     """
@@ -16,58 +44,79 @@ def search_kb(query: str, top_k: int = 5) -> List[Dict[str, str]]:
     Returns:
         List[Dict[str, str]]: List of dictionary objects with 'title' and 'content' keys
     """
+    # Prefer semantic retrieval when the optional embedding stack is
+    # installed - paraphrased questions match far better than with
+    # lexical FTS5. Falls through to FTS5 otherwise.
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        # Check if advanced schema exists (with category column)
-        c.execute("PRAGMA table_info(kb)")
-        columns = [col[1] for col in c.fetchall()]
-        
-        if 'category' in columns:
-            # New schema with category support
-            c.execute("SELECT title, content FROM kb WHERE kb MATCH ? ORDER BY rank LIMIT ?", (query, top_k))
-        else:
-            # Old schema - just title and content
-            c.execute("SELECT title, content FROM kb WHERE kb MATCH ? LIMIT ?", (query, top_k))
-            
-        rows = c.fetchall()
-        conn.close()
-        
-        return [{"title": row[0], "content": row[1]} for row in rows]
-        
+        from tools import semantic
+        if semantic.is_available():
+            results = semantic.search(query, top_k=top_k)
+            if results:
+                return results
+    except Exception as e:
+        logger.warning("Semantic search failed, falling back to FTS5: %s", e)
+
+    try:
+        # Copy at the boundary: cached rows must never be handed out as
+        # shared mutable dicts.
+        return [dict(r) for r in _search_kb_fts(query, top_k)]
     except sqlite3.Error as e:
-        print(f"Database error in search_kb: {e}")
+        logger.warning("Database error in search_kb: %s", e)
         return []
     except Exception as e:
-        print(f"Unexpected error in search_kb: {e}")
+        logger.warning("Unexpected error in search_kb: %s", e)
         return []
 
-def add_kb_entry(title: str, content: str) -> bool:
+@lru_cache(maxsize=1024)
+def _search_kb_fts(query: str, top_k: int):
+    """FTS lookup memoized per (query, top_k); chat traffic repeats the
+    same questions constantly. Cleared on every KB write. The returned
+    tuple's dicts are shared cache state - search_kb copies them before
+    handing them to callers."""
+    # Both schema variants are FTS5 tables projecting title and content,
+    # so the ranked query works unconditionally; the schema check only
+    # matters for inserts.
+    c = get_conn().execute(SQL_SEARCH_KB, (query, top_k))
+    return tuple(map(dict, c.fetchall()))
+
+def add_kb_entries(entries) -> bool:
     """
-    Add a new entry to the knowledge base.
-    
+    Add many entries to the knowledge base in one transaction.
+
     Args:
-        title (str): The title/topic of the KB entry
-        content (str): The content/answer for the entry
-        
+        entries: Iterable of (title, content) tuples
+
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("INSERT INTO kb(title, content) VALUES(?, ?)", (title, content))
-        conn.commit()
-        conn.close()
+        conn = get_conn()
+        # One BEGIN..COMMIT around the whole batch: a bulk load costs a
+        # single fsync instead of one per row.
+        with conn:
+            conn.executemany(SQL_INSERT_KB, entries)
+        _search_kb_fts.cache_clear()
         return True
     except sqlite3.Error as e:
-        print(f"Database error in add_kb_entry: {e}")
+        logger.warning("Database error in add_kb_entries: %s", e)
         return False
     except Exception as e:
-        print(f"Unexpected error in add_kb_entry: {e}")
+        logger.warning("Unexpected error in add_kb_entries: %s", e)
         return False
 
+def add_kb_entry(title: str, content: str) -> bool:
+    """
+    Add a new entry to the knowledge base.
+    
+    Args:
+        title (str): The title/topic of the KB entry
+        content (str): The content/answer for the entry
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return add_kb_entries([(title, content)])
+
 def add_kb_entry_with_category(title: str, content: str, category: str = "General", tags: str = "") -> bool:
     """
     Add a new entry to the knowledge base with category and tags.
@@ -82,29 +131,24 @@ def add_kb_entry_with_category(title: str, content: str, category: str = "Genera
         bool: True if successful, False otherwise
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_conn()
         c = conn.cursor()
-        
-        # Check if advanced schema exists
-        c.execute("PRAGMA table_info(kb)")
-        columns = [col[1] for col in c.fetchall()]
-        
-        if 'category' in columns and 'tags' in columns:
+
+        if _kb_has_category(c):
             # New schema with category and tags
-            c.execute("INSERT INTO kb(title, content, category, tags) VALUES(?, ?, ?, ?)", 
-                     (title, content, category, tags))
+            c.execute(SQL_INSERT_KB_CAT, (title, content, category, tags))
         else:
             # Old schema - just title and content
-            c.execute("INSERT INTO kb(title, content) VALUES(?, ?)", (title, content))
-            
+            c.execute(SQL_INSERT_KB, (title, content))
+
         conn.commit()
-        conn.close()
+        _search_kb_fts.cache_clear()
         return True
     except sqlite3.Error as e:
-        print(f"Database error in add_kb_entry_with_category: {e}")
+        logger.warning("Database error in add_kb_entry_with_category: %s", e)
         return False
     except Exception as e:
-        print(f"Unexpected error in add_kb_entry_with_category: {e}")
+        logger.warning("Unexpected error in add_kb_entry_with_category: %s", e)
         return False
 
 def get_all_kb_entries() -> List[Dict[str, str]]:
@@ -115,13 +159,13 @@ def get_all_kb_entries() -> List[Dict[str, str]]:
         List[Dict[str, str]]: List of all KB entries
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_conn()
         c = conn.cursor()
-        c.execute("SELECT title, content FROM kb")
+        c.execute(SQL_ALL_KB)
         rows = c.fetchall()
-        conn.close()
-        
-        return [{"title": row[0], "content": row[1]} for row in rows]
+
+        # map + dict run entirely in C over sqlite3.Row objects
+        return list(map(dict, rows))
     except sqlite3.Error as e:
-        print(f"Database error in get_all_kb_entries: {e}")
+        logger.warning("Database error in get_all_kb_entries: %s", e)
         return []
@@ -0,0 +1,177 @@
+"""
+Optional semantic retrieval layer for the knowledge base.
+
+Lexical FTS5 matching misses paraphrases ("can I send back my order" vs
+"Return Policy"), so when the optional embedding dependencies are
+installed this module serves KB searches from an approximate
+nearest-neighbour index over sentence embeddings instead. When they are
+not installed, every entry point degrades to a no-op and `search_kb`
+keeps using FTS5.
+
+Optional dependencies: sentence-transformers (+ numpy), faiss-cpu.
+Without faiss, a plain numpy dot-product scan is used, which is fine at
+this KB's size.
+"""
+
+import functools
+import json
+import logging
+import os
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+DB_DIR = os.path.join(os.path.dirname(__file__), "../db")
+EMBEDDINGS_PATH = os.path.join(DB_DIR, "kb_embeddings.npy")
+DOCS_PATH = os.path.join(DB_DIR, "kb_docs.json")
+
+_model = None
+_index = None       # faiss index when faiss is installed
+_embeddings = None  # normalized (n, dim) matrix, numpy fallback path
+_docs: List[Dict[str, str]] = []
+
+
+def is_available() -> bool:
+    """True when the optional embedding dependencies are installed."""
+    return SentenceTransformer is not None and np is not None
+
+
+def _make_index(vectors):
+    """Build a faiss index over normalized vectors.
+
+    Scalar-quantized to int8: a quarter of the float32 footprint and
+    SIMD int8 dot products on the query path. At >100k entries this
+    should become an IVFPQ index instead.
+    """
+    index = faiss.IndexScalarQuantizer(
+        vectors.shape[1], faiss.ScalarQuantizer.QT_8bit,
+        faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def _get_model():
+    """Load the sentence-transformer once per process."""
+    global _model
+    if _model is None:
+        _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+
+def _encode(texts: List[str]):
+    """Encode and L2-normalize texts so inner product equals cosine."""
+    vectors = _get_model().encode(texts, convert_to_numpy=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _build(entries: List[Dict[str, str]], persist: bool = True) -> bool:
+    """Build the in-memory index (and optionally persist it) from KB entries."""
+    global _index, _embeddings, _docs
+    if not entries:
+        return False
+
+    vectors = _encode([f"{e['title']} {e['content']}" for e in entries])
+    _docs = entries
+    _embeddings = vectors
+
+    if faiss is not None:
+        _index = _make_index(vectors)
+
+    if persist:
+        try:
+            np.save(EMBEDDINGS_PATH, vectors)
+            with open(DOCS_PATH, "w") as f:
+                json.dump(entries, f)
+        except OSError as e:
+            logger.warning("Could not persist KB embeddings: %s", e)
+    return True
+
+
+def _load_persisted() -> bool:
+    """Load a previously persisted index from disk, if any."""
+    global _index, _embeddings, _docs
+    if not (os.path.exists(EMBEDDINGS_PATH) and os.path.exists(DOCS_PATH)):
+        return False
+    try:
+        vectors = np.load(EMBEDDINGS_PATH)
+        with open(DOCS_PATH) as f:
+            docs = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load persisted KB embeddings: %s", e)
+        return False
+    if len(docs) != vectors.shape[0]:
+        return False
+    _docs = docs
+    _embeddings = vectors.astype(np.float32)
+    if faiss is not None:
+        _index = _make_index(_embeddings)
+    return True
+
+
+def ensure_index() -> bool:
+    """Make sure an index is ready; returns False when unavailable."""
+    if not is_available():
+        return False
+    if _embeddings is not None:
+        return True
+    if _load_persisted():
+        return True
+    from tools.kb import get_all_kb_entries
+    return _build(get_all_kb_entries())
+
+
+def rebuild_index() -> bool:
+    """Re-encode the whole KB, e.g. after (re)seeding the database."""
+    global _index, _embeddings, _docs
+    if not is_available():
+        return False
+    _index, _embeddings, _docs = None, None, []
+    _embed_query.cache_clear()
+    from tools.kb import get_all_kb_entries
+    return _build(get_all_kb_entries())
+
+
+@functools.lru_cache(maxsize=8192)
+def _embed_query(query: str):
+    """Encode a single query, memoized - the encoder forward pass dominates
+    short-query lookups and query distributions are highly non-uniform.
+    The cached array must be treated as read-only."""
+    vector = _encode([query])
+    vector.setflags(write=False)
+    return vector
+
+
+def search(query: str, top_k: int = 5) -> List[Dict[str, str]]:
+    """Return the top_k semantically closest KB entries for the query."""
+    if not ensure_index():
+        return []
+    q = _embed_query(" ".join(query.lower().split()))
+    top_k = min(top_k, len(_docs))
+    if _index is not None:
+        _, ids = _index.search(q, top_k)
+        hits = ids[0]
+    else:
+        scores = _embeddings @ q[0]
+        hits = np.argsort(scores)[::-1][:top_k]
+    return [{"title": _docs[i]["title"], "content": _docs[i]["content"]}
+            for i in hits if i >= 0]
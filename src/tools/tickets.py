@@ -1,9 +1,26 @@
+import logging
 import sqlite3
-import os
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "../db/agent_data.db")
+from db.init_db import get_conn
+
+logger = logging.getLogger(__name__)
+
+# Stable SQL strings so sqlite3's per-connection statement cache
+# (cached_statements on the shared connection) parses each query once.
+SQL_INSERT_TICKET = "INSERT INTO tickets(customer_name, customer_email, subject, body) VALUES(?,?,?,?)"
+SQL_GET_TICKET = "SELECT id, customer_name, customer_email, subject, body, status, created_at FROM tickets WHERE id = ?"
+SQL_LIST_OPEN = "SELECT id, customer_name, subject, created_at FROM tickets WHERE status='open' ORDER BY created_at DESC"
+SQL_UPDATE_STATUS = "UPDATE tickets SET status = ? WHERE id = ?"
+
+_WS = ' \t\n\r'
+
+def _sstrip(s: str) -> str:
+    """strip() that returns the original string when already clean,
+    avoiding an allocation per field on the write path."""
+    return s if not s or (s[0] not in _WS and s[-1] not in _WS) else s.strip()
 
 def create_ticket(customer_name: str, customer_email: str, subject: str, body: str) -> Optional[int]:
     """
@@ -19,28 +36,28 @@ def create_ticket(customer_name: str, customer_email: str, subject: str, body: s
         Optional[int]: Ticket ID if successful, None otherwise
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_conn()
         c = conn.cursor()
         
         # Validate inputs
         if not customer_name or not customer_email or not subject:
-            print("Missing required fields for ticket creation")
+            logger.warning("Missing required fields for ticket creation")
             return None
             
-        c.execute("INSERT INTO tickets(customer_name, customer_email, subject, body) VALUES(?,?,?,?)",
-                  (customer_name.strip(), customer_email.strip(), subject.strip(), body.strip()))
+        c.execute(SQL_INSERT_TICKET,
+                  (_sstrip(customer_name), _sstrip(customer_email), _sstrip(subject), _sstrip(body)))
         ticket_id = c.lastrowid
         conn.commit()
-        conn.close()
-        
-        print(f"Ticket created successfully with ID: {ticket_id}")
+        _get_ticket_cached.cache_clear()
+
+        logger.info("Ticket created successfully with ID: %s", ticket_id)
         return ticket_id
         
     except sqlite3.Error as e:
-        print(f"Database error in create_ticket: {e}")
+        logger.warning("Database error in create_ticket: %s", e)
         return None
     except Exception as e:
-        print(f"Unexpected error in create_ticket: {e}")
+        logger.warning("Unexpected error in create_ticket: %s", e)
         return None
 
 def get_ticket_by_id(ticket_id: int) -> Optional[Dict[str, Any]]:
@@ -54,28 +71,52 @@ def get_ticket_by_id(ticket_id: int) -> Optional[Dict[str, Any]]:
         Optional[Dict[str, Any]]: Ticket data if found, None otherwise
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,))
-        row = c.fetchone()
-        conn.close()
-        
-        if row:
-            return {
-                "id": row[0],
-                "customer_name": row[1],
-                "customer_email": row[2],
-                "subject": row[3],
-                "body": row[4],
-                "status": row[5],
-                "created_at": row[6]
-            }
-        return None
-        
+        return _get_ticket_cached(ticket_id)
     except sqlite3.Error as e:
-        print(f"Database error in get_ticket_by_id: {e}")
+        logger.warning("Database error in get_ticket_by_id: %s", e)
         return None
 
+@lru_cache(maxsize=1024)
+def _get_ticket_cached(ticket_id: int) -> Optional[Dict[str, Any]]:
+    """Ticket lookup memoized by id; cleared on every ticket write."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(SQL_GET_TICKET, (ticket_id,))
+    row = c.fetchone()
+
+    return dict(row) if row else None
+
+def get_tickets_by_ids(ticket_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Retrieve several tickets in one query.
+
+    Args:
+        ticket_ids (List[int]): The ticket IDs to retrieve
+
+    Returns:
+        List[Dict[str, Any]]: Tickets found, in id order
+    """
+    if not ticket_ids:
+        return []
+    try:
+        conn = get_conn()
+        c = conn.cursor()
+        # Pad the id list to the next power of two with -1 (never a
+        # valid rowid) so only ~log(N) distinct SQL shapes exist and
+        # each stays in the statement cache.
+        n = 1
+        while n < len(ticket_ids):
+            n *= 2
+        padded = list(ticket_ids) + [-1] * (n - len(ticket_ids))
+        qmarks = ','.join('?' * n)
+        c.execute(
+            "SELECT id, customer_name, customer_email, subject, body, status, created_at "
+            f"FROM tickets WHERE id IN ({qmarks}) ORDER BY id", padded)
+        return list(map(dict, c.fetchall()))
+    except sqlite3.Error as e:
+        logger.warning("Database error in get_tickets_by_ids: %s", e)
+        return []
+
 def list_open_tickets() -> List[Dict[str, Any]]:
     """
     List all open support tickets.
@@ -84,19 +125,19 @@ def list_open_tickets() -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: List of open tickets
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_conn()
         c = conn.cursor()
-        c.execute("SELECT id, customer_name, subject, created_at FROM tickets WHERE status='open' ORDER BY created_at DESC")
+        c.execute(SQL_LIST_OPEN)
         rows = c.fetchall()
-        conn.close()
-        
-        return [{"id": row[0], "customer_name": row[1], "subject": row[2], "created_at": row[3]} for row in rows]
+
+        # map + dict run entirely in C over sqlite3.Row objects
+        return list(map(dict, rows))
         
     except sqlite3.Error as e:
-        print(f"Database error in list_open_tickets: {e}")
+        logger.warning("Database error in list_open_tickets: %s", e)
         return []
     except Exception as e:
-        print(f"Unexpected error in list_open_tickets: {e}")
+        logger.warning("Unexpected error in list_open_tickets: %s", e)
         return []
 
 def update_ticket_status(ticket_id: int, new_status: str) -> bool:
@@ -111,15 +152,15 @@ def update_ticket_status(ticket_id: int, new_status: str) -> bool:
         bool: True if successful, False otherwise
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_conn()
         c = conn.cursor()
-        c.execute("UPDATE tickets SET status = ? WHERE id = ?", (new_status, ticket_id))
-        conn.commit()
+        c.execute(SQL_UPDATE_STATUS, (new_status, ticket_id))
         affected_rows = c.rowcount
-        conn.close()
-        
+        conn.commit()
+        _get_ticket_cached.cache_clear()
+
         return affected_rows > 0
         
     except sqlite3.Error as e:
-        print(f"Database error in update_ticket_status: {e}")
+        logger.warning("Database error in update_ticket_status: %s", e)
         return False